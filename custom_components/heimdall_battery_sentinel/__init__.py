@@ -5,36 +5,46 @@ import logging
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.typing import ConfigType
 
-from .const import CONF_THRESHOLD, DATA_LOW_BATTERIES, DEFAULT_THRESHOLD, DOMAIN
+from .const import DOMAIN
 from .event_handlers import async_reevaluate_batteries, async_setup_event_handlers
-from .runtime import init_entry_runtime, remove_entry_runtime, unsubscribe_all
+from .runtime import (
+    get_entry_runtime,
+    init_entry_runtime,
+    mark_changed,
+    remove_entry_runtime,
+    threshold_for_entry,
+    unsubscribe_all,
+)
 from .views import async_register_panel_and_views, async_unregister_panel
 from .websocket_handlers import register_websocket_commands
 
 _LOGGER = logging.getLogger(__name__)
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the Heimdall Battery Sentinel component."""
+    register_websocket_commands(hass)
+    return True
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Heimdall Battery Sentinel from a config entry."""
-    _LOGGER.setLevel(logging.DEBUG)
-
-    threshold = entry.options.get(
-        CONF_THRESHOLD,
-        entry.data.get(CONF_THRESHOLD, DEFAULT_THRESHOLD),
-    )
+    runtime = init_entry_runtime(hass, entry)
     _LOGGER.debug(
         "Setting up %s integration - Entry ID: %s, Threshold: %d%%",
         DOMAIN,
         entry.entry_id,
-        threshold,
+        runtime.threshold,
     )
 
-    init_entry_runtime(hass, entry.entry_id)
     entry.async_on_unload(entry.add_update_listener(async_update_options))
 
     await async_register_panel_and_views(hass)
-    register_websocket_commands(hass)
     await async_setup_event_handlers(hass, entry)
 
     _LOGGER.info("Heimdall Battery Sentinel integration setup complete")
@@ -45,13 +55,13 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     _LOGGER.debug("Unloading Heimdall Battery Sentinel integration - Entry ID: %s", entry.entry_id)
 
-    listener_count = unsubscribe_all(hass, entry.entry_id)
-    _LOGGER.debug("Unsubscribed %d event listeners", listener_count)
-
-    low_battery_count = len(
-        hass.data.get(DOMAIN, {}).get(entry.entry_id, {}).get(DATA_LOW_BATTERIES, {})
-    )
-    _LOGGER.debug("Cleaning up data (%d low batteries tracked)", low_battery_count)
+    runtime = get_entry_runtime(hass, entry.entry_id)
+    if runtime is not None:
+        listener_count = unsubscribe_all(runtime)
+        _LOGGER.debug("Unsubscribed %d event listeners", listener_count)
+        _LOGGER.debug(
+            "Cleaning up data (%d low batteries tracked)", len(runtime.low_batteries)
+        )
     remove_entry_runtime(hass, entry.entry_id)
 
     if not hass.data.get(DOMAIN):
@@ -64,9 +74,11 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
 async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Handle options update."""
-    new_threshold = entry.options.get(
-        CONF_THRESHOLD,
-        entry.data.get(CONF_THRESHOLD, DEFAULT_THRESHOLD),
-    )
-    _LOGGER.info("Options updated - New threshold: %d%%", new_threshold)
+    runtime = get_entry_runtime(hass, entry.entry_id)
+    if runtime is None:
+        return
+
+    runtime.threshold = threshold_for_entry(entry)
+    mark_changed(runtime)
+    _LOGGER.info("Options updated - New threshold: %d%%", runtime.threshold)
     await async_reevaluate_batteries(hass, entry)
@@ -4,10 +4,27 @@ import json
 import urllib.request
 import urllib.error
 
+try:
+    import orjson
+except ImportError:  # plain python3 on the target host may not ship orjson
+    orjson = None
+
+
+def loads(body):
+    """Parse a JSON response body, using orjson when it is available."""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
 
 def make_request(url, method="GET", token=None, data=None):
     """Make an HTTP request using urllib.
 
+    This is a blocking call intended for the standalone deploy scripts, which
+    run under a plain python3 interpreter outside Home Assistant. It must not
+    be called from the event loop; integration code should use
+    homeassistant.helpers.aiohttp_client.async_get_clientsession instead.
+
     Args:
         url: The URL to request
         method: HTTP method (GET, POST, DELETE, etc.)
@@ -5,6 +5,9 @@ DOMAIN = "heimdall_battery_sentinel"
 # Configuration keys
 CONF_THRESHOLD = "threshold"
 
+# Device class used to identify battery entities
+DEVICE_CLASS_BATTERY = "battery"
+
 # Defaults
 DEFAULT_THRESHOLD = 20
 
@@ -13,9 +16,3 @@ PANEL_TITLE = "Heimdall Battery Sentinel"
 PANEL_ICON = "mdi:battery-20"
 PANEL_URL = "heimdall-battery-sentinel"
 PANEL_NAME = "heimdall-battery-sentinel-panel"
-
-# Data keys
-DATA_ALL_BATTERIES = "all_batteries"
-DATA_LOW_BATTERIES = "low_batteries"
-DATA_UNSUB = "unsub"
-DATA_WS_SUBSCRIBERS = "ws_subscribers"
@@ -1,154 +1,298 @@
 """Event handling for battery discovery and state updates."""
 from __future__ import annotations
 
-import json
+import asyncio
 import logging
 from typing import Any
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import ATTR_DEVICE_CLASS, EVENT_STATE_CHANGED, STATE_UNAVAILABLE, STATE_UNKNOWN
+from homeassistant.const import ATTR_DEVICE_CLASS, MATCH_ALL, STATE_UNAVAILABLE, STATE_UNKNOWN
 from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.event import (
+    async_track_entity_registry_updated_event,
+    async_track_state_added_domain,
+    async_track_state_change_event,
+)
 
-from .const import DATA_ALL_BATTERIES, DATA_LOW_BATTERIES
+from .const import DEVICE_CLASS_BATTERY
 from .runtime import (
+    BatteryRecord,
+    EntryRuntime,
+    add_tracker,
     add_unsubscriber,
     get_entry_runtime,
-    threshold_for_entry,
+    mark_changed,
+    remove_tracker,
 )
 from .websocket_handlers import notify_frontend_update
 
 _LOGGER = logging.getLogger(__name__)
 
+_UNAVAILABLE_STATES = frozenset({STATE_UNAVAILABLE, STATE_UNKNOWN})
+
+# Attributes that feed into a tracked battery record besides the state itself.
+_READING_ATTRIBUTES = ("battery", "friendly_name", "unit_of_measurement")
+
+# Number of entities evaluated in bulk before yielding to the event loop.
+_EVALUATE_BATCH_SIZE = 50
+
 
 async def async_setup_event_handlers(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Set up battery tracking and event listeners for an entry."""
-    battery_entities = _discover_battery_entities(hass)
-    _LOGGER.info("Discovered %d battery entities", len(battery_entities))
-    await _async_evaluate_batteries(hass, entry, battery_entities)
+    runtime = get_entry_runtime(hass, entry.entry_id)
 
     @callback
-    def async_battery_state_listener(event: Event) -> None:
-        entity_id = event.data.get("entity_id")
-        new_state = event.data.get("new_state")
-        old_state = event.data.get("old_state")
-        if not entity_id:
+    def async_state_added_listener(event: Event) -> None:
+        new_state = event.data["new_state"]
+        if not _is_battery_state(new_state):
             return
+        entity_id = new_state.entity_id
+        # Registry entries discovered before their state appeared already have
+        # a per-entity tracker, which handles this same event.
+        if entity_id in runtime.trackers:
+            return
+        _LOGGER.debug("Battery entity added to state machine: %s", entity_id)
+        _async_track_battery(hass, runtime, entity_id)
+        _handle_battery_state_change(runtime, entity_id, new_state)
 
-        runtime = get_entry_runtime(hass, entry.entry_id)
-        is_tracked = entity_id in runtime.get(DATA_ALL_BATTERIES, {})
-        is_battery_now = bool(new_state and _is_battery_state(new_state))
-
-        if is_battery_now and new_state is not None:
-            _LOGGER.debug(
-                "Battery state change event: %s (old: %s, new: %s)",
-                entity_id,
-                old_state.state if old_state else "None",
-                new_state.state,
-            )
-            _handle_battery_state_change(hass, entry, entity_id, new_state)
-        elif is_tracked:
-            _LOGGER.debug("Entity %s is no longer a battery entity or has no state", entity_id)
-            _remove_battery_entity(hass, entry, entity_id, reason="removed_or_not_battery")
-
+    # Batteries are tracked per entity_id; this listener only wakes for entities
+    # that appear after the initial scan starts so they join the tracked set.
     add_unsubscriber(
-        hass,
-        entry.entry_id,
-        hass.bus.async_listen(EVENT_STATE_CHANGED, async_battery_state_listener),
+        runtime,
+        async_track_state_added_domain(hass, MATCH_ALL, async_state_added_listener),
     )
 
     @callback
     def async_entity_registry_updated(event: Event) -> None:
-        action = event.data.get("action")
-        entity_id = event.data.get("entity_id")
-        _LOGGER.debug("Entity registry update: action=%s, entity_id=%s", action, entity_id)
-        if not entity_id:
+        # Tracked batteries have their own per-entity registry listener, so
+        # only untracked ids that may have become batteries are handled here.
+        if event.data["action"] == "remove":
+            return
+        entity_id = event.data["entity_id"]
+        if entity_id in runtime.trackers:
             return
 
-        if action == "create":
-            if _is_battery_entity(hass, entity_id):
-                _LOGGER.info("New battery entity discovered: %s", entity_id)
-                state = hass.states.get(entity_id)
-                if state:
-                    _handle_battery_state_change(hass, entry, entity_id, state)
-        elif action == "remove":
-            _LOGGER.info("Battery entity removed from registry: %s", entity_id)
-            _remove_battery_entity(hass, entry, entity_id, reason="entity_removed")
-        elif action == "update":
-            state = hass.states.get(entity_id)
-            if state and _is_battery_state(state):
-                _handle_battery_state_change(hass, entry, entity_id, state)
-            else:
-                _remove_battery_entity(hass, entry, entity_id, reason="entity_updated_not_battery")
+        # The state may not reflect the registry change yet, so the registry
+        # entry decides too; the new tracker picks up the state write after it.
+        state = hass.states.get(entity_id)
+        is_battery_state = _is_battery_state(state)
+        if not is_battery_state and not _is_battery_registry_entry(
+            er.async_get(hass).async_get(entity_id)
+        ):
+            return
+        _LOGGER.info("New battery entity discovered: %s", entity_id)
+        _async_track_battery(hass, runtime, entity_id)
+        if is_battery_state:
+            _handle_battery_state_change(runtime, entity_id, state)
 
     add_unsubscriber(
-        hass,
-        entry.entry_id,
-        hass.bus.async_listen("entity_registry_updated", async_entity_registry_updated),
+        runtime,
+        hass.bus.async_listen(er.EVENT_ENTITY_REGISTRY_UPDATED, async_entity_registry_updated),
     )
 
+    # Listeners are in place before the initial scan, which yields to the event
+    # loop, so entities added while it runs are not missed.
+    battery_entities = _discover_battery_entities(hass, runtime, include_unregistered=True)
+    _LOGGER.info("Discovered %d battery entities", len(battery_entities))
+    if await _async_evaluate_batteries(hass, runtime, battery_entities):
+        notify_frontend_update(runtime, reason="initial_scan", entity_id="*")
+
 
 async def async_reevaluate_batteries(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Re-evaluate tracked batteries after options updates."""
     _LOGGER.debug("Re-evaluating all battery entities")
-    await _async_evaluate_batteries(hass, entry, _discover_battery_entities(hass))
+    runtime = get_entry_runtime(hass, entry.entry_id)
+    await _async_evaluate_batteries(hass, runtime, _discover_battery_entities(hass, runtime))
+    # The threshold is part of the payload, so push even if no battery changed.
+    notify_frontend_update(runtime, reason="reevaluate", entity_id="*")
     _LOGGER.debug("Re-evaluation complete")
 
 
-def _discover_battery_entities(hass: HomeAssistant) -> list[str]:
-    battery_entities: list[str] = []
+def _discover_battery_entities(
+    hass: HomeAssistant, runtime: EntryRuntime, include_unregistered: bool = False
+) -> list[str]:
+    """Return candidate battery entity ids from the entity registry.
+
+    Registry entries without a current state are included so their tracker is
+    in place when the state appears; disabled entries are skipped. Already
+    tracked ids are kept as well.
+
+    Battery entities without a registry entry (YAML/template sensors without a
+    unique_id, states set directly) are only visible in the state machine. With
+    include_unregistered, used at setup, current states are scanned once for
+    them; afterwards they are picked up by the state-added listener and kept
+    through their trackers.
+    """
     _LOGGER.debug("Starting battery entity discovery")
-    for state in hass.states.async_all():
-        if _is_battery_state(state):
-            battery_entities.append(state.entity_id)
-            _LOGGER.debug(
-                "Battery entity discovered: %s (name: %s, state: %s)",
-                state.entity_id,
-                state.attributes.get("friendly_name", state.entity_id),
-                state.state,
-            )
+    entity_reg = er.async_get(hass)
+    registry_entities = entity_reg.entities
+    unregistered: list[str] = []
+    if include_unregistered:
+        unregistered = [
+            state.entity_id
+            for state in hass.states.async_all()
+            if _is_battery_state(state) and state.entity_id not in registry_entities
+        ]
+    battery_entities = list(
+        dict.fromkeys(
+            [
+                *(
+                    reg_entry.entity_id
+                    for reg_entry in registry_entities.values()
+                    if _is_battery_registry_entry(reg_entry)
+                ),
+                *unregistered,
+                *runtime.trackers,
+            ]
+        )
+    )
     _LOGGER.debug("Battery entity discovery complete: found %d entities", len(battery_entities))
     return battery_entities
 
 
-def _is_battery_entity(hass: HomeAssistant, entity_id: str) -> bool:
-    state = hass.states.get(entity_id)
-    return _is_battery_state(state)
+def _is_battery_state(state: Any) -> bool:
+    return state is not None and state.attributes.get(ATTR_DEVICE_CLASS) == DEVICE_CLASS_BATTERY
 
 
-def _is_battery_state(state: Any) -> bool:
-    return state is not None and state.attributes.get(ATTR_DEVICE_CLASS) == "battery"
+def _is_battery_registry_entry(reg_entry: er.RegistryEntry | None) -> bool:
+    return (
+        reg_entry is not None
+        and not reg_entry.disabled_by
+        and (reg_entry.device_class or reg_entry.original_device_class) == DEVICE_CLASS_BATTERY
+    )
 
 
-async def _async_evaluate_batteries(hass: HomeAssistant, entry: ConfigEntry, entity_ids: list[str]) -> None:
-    for entity_id in entity_ids:
-        state = hass.states.get(entity_id)
-        if state:
-            _handle_battery_state_change(hass, entry, entity_id, state)
+def _is_same_reading(old_state: Any, new_state: Any) -> bool:
+    """Return whether a state change leaves the tracked battery reading untouched."""
+    if old_state is None or old_state.state != new_state.state:
+        return False
+    old_attrs = old_state.attributes
+    new_attrs = new_state.attributes
+    return all(old_attrs.get(attr) == new_attrs.get(attr) for attr in _READING_ATTRIBUTES)
+
+
+def _parse_battery_level(value: Any) -> float | None:
+    """Parse a battery level, skipping try/except for plain decimal strings."""
+    if isinstance(value, str) and value.replace(".", "", 1).isdecimal():
+        return float(value)
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+async def _async_evaluate_batteries(
+    hass: HomeAssistant, runtime: EntryRuntime, entity_ids: list[str]
+) -> bool:
+    """Evaluate batteries in bulk and return whether any tracked data changed.
+
+    Per-entity frontend pushes are suppressed while the loop runs; callers
+    send a single update afterwards. The loop yields every
+    _EVALUATE_BATCH_SIZE entities so large installs don't stall the event loop,
+    and stops early if the entry is unloaded meanwhile.
+    """
+    start_version = runtime.version
+    runtime.bulk_update = True
+    try:
+        for index, entity_id in enumerate(entity_ids, 1):
+            if not index % _EVALUATE_BATCH_SIZE:
+                await asyncio.sleep(0)
+                # The entry may have been unloaded while yielding; trackers
+                # added to a closed runtime would never be unsubscribed.
+                if runtime.closed:
+                    break
+            _async_track_battery(hass, runtime, entity_id)
+            state = hass.states.get(entity_id)
+            if _is_battery_state(state):
+                _handle_battery_state_change(runtime, entity_id, state)
+            elif state is not None:
+                _remove_battery_entity(runtime, entity_id, reason="removed_or_not_battery")
+    finally:
+        runtime.bulk_update = False
+    return runtime.version != start_version
 
 
 @callback
-def _remove_battery_entity(hass: HomeAssistant, entry: ConfigEntry, entity_id: str, reason: str) -> None:
-    runtime = get_entry_runtime(hass, entry.entry_id)
-    all_batteries = runtime.get(DATA_ALL_BATTERIES, {})
-    low_batteries = runtime.get(DATA_LOW_BATTERIES, {})
+def _async_track_battery(hass: HomeAssistant, runtime: EntryRuntime, entity_id: str) -> None:
+    """Subscribe to state and registry changes for a single battery entity."""
+    if entity_id in runtime.trackers:
+        return
+
+    @callback
+    def async_battery_state_listener(event: Event) -> None:
+        new_state = event.data["new_state"]
+        if new_state is None:
+            _LOGGER.debug("Battery entity %s was removed from the state machine", entity_id)
+            remove_tracker(runtime, entity_id)
+            _remove_battery_entity(runtime, entity_id, reason="removed_or_not_battery")
+            return
+
+        if not _is_battery_state(new_state):
+            _LOGGER.debug("Entity %s is no longer a battery entity", entity_id)
+            _remove_battery_entity(runtime, entity_id, reason="removed_or_not_battery")
+            return
+
+        old_state = event.data["old_state"]
+        if entity_id in runtime.all_batteries and _is_same_reading(old_state, new_state):
+            return
+
+        _LOGGER.debug(
+            "Battery state change event: %s (old: %s, new: %s)",
+            entity_id,
+            old_state.state if old_state else "None",
+            new_state.state,
+        )
+        _handle_battery_state_change(runtime, entity_id, new_state)
+
+    @callback
+    def async_battery_registry_listener(event: Event) -> None:
+        action = event.data["action"]
+        if action == "remove":
+            _LOGGER.info("Battery entity removed from registry: %s", entity_id)
+            remove_tracker(runtime, entity_id)
+            _remove_battery_entity(runtime, entity_id, reason="entity_removed")
+        elif action == "update":
+            state = hass.states.get(entity_id)
+            if _is_battery_state(state):
+                _handle_battery_state_change(runtime, entity_id, state)
+            else:
+                _remove_battery_entity(runtime, entity_id, reason="entity_updated_not_battery")
+
+    unsub_state = async_track_state_change_event(
+        hass, [entity_id], async_battery_state_listener
+    )
+    unsub_registry = async_track_entity_registry_updated_event(
+        hass, [entity_id], async_battery_registry_listener
+    )
+
+    @callback
+    def async_untrack() -> None:
+        unsub_state()
+        unsub_registry()
+
+    add_tracker(runtime, entity_id, async_untrack)
+
 
-    removed_from_all = all_batteries.pop(entity_id, None) is not None
-    removed_from_low = low_batteries.pop(entity_id, None) is not None
+@callback
+def _remove_battery_entity(runtime: EntryRuntime, entity_id: str, reason: str) -> None:
+    removed_from_all = runtime.all_batteries.pop(entity_id, None) is not None
+    removed_from_low = runtime.low_batteries.pop(entity_id, None) is not None
     if removed_from_all or removed_from_low:
+        mark_changed(runtime)
         _LOGGER.debug(
             "Removed entity %s from tracking (all=%s, low=%s)",
             entity_id,
             removed_from_all,
             removed_from_low,
         )
-        notify_frontend_update(hass, entry, reason=reason, entity_id=entity_id)
+        notify_frontend_update(runtime, reason=reason, entity_id=entity_id)
 
 
 @callback
-def _handle_battery_state_change(
-    hass: HomeAssistant, entry: ConfigEntry, entity_id: str, state: Any
-) -> None:
-    friendly_name = state.attributes.get("friendly_name", entity_id)
+def _handle_battery_state_change(runtime: EntryRuntime, entity_id: str, state: Any) -> None:
+    attrs = state.attributes
+    friendly_name = attrs.get("friendly_name", entity_id)
     _LOGGER.debug(
         "Processing battery state for %s (name: %s, state: %s)",
         entity_id,
@@ -156,28 +300,18 @@ def _handle_battery_state_change(
         state.state,
     )
 
-    entity_details = {
-        "entity_id": entity_id,
-        "state": state.state,
-        "attributes": dict(state.attributes),
-        "last_changed": str(state.last_changed),
-        "last_updated": str(state.last_updated),
-    }
-    _LOGGER.debug("Entity JSON dump: %s", json.dumps(entity_details, indent=2))
-
-    if state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN):
-        _remove_battery_entity(hass, entry, entity_id, reason="state_unavailable_or_unknown")
+    _LOGGER.debug("Entity dump: %s", state)
+
+    if state.state in _UNAVAILABLE_STATES:
+        _remove_battery_entity(runtime, entity_id, reason="state_unavailable_or_unknown")
         return
 
-    battery_level = None
-    try:
-        battery_level = float(state.state)
-    except (ValueError, TypeError):
-        battery_attr = state.attributes.get("battery")
+    battery_level = _parse_battery_level(state.state)
+    if battery_level is None:
+        battery_attr = attrs.get("battery")
         if battery_attr is not None:
-            try:
-                battery_level = float(battery_attr)
-            except (ValueError, TypeError):
+            battery_level = _parse_battery_level(battery_attr)
+            if battery_level is None:
                 _LOGGER.debug(
                     "Entity %s has battery attribute but can't parse as float: %s",
                     entity_id,
@@ -185,34 +319,45 @@ def _handle_battery_state_change(
                 )
 
     if battery_level is None:
-        _remove_battery_entity(hass, entry, entity_id, reason="non_numeric_battery")
+        _remove_battery_entity(runtime, entity_id, reason="non_numeric_battery")
         return
 
-    threshold = threshold_for_entry(entry)
-    runtime = get_entry_runtime(hass, entry.entry_id)
-    all_batteries = runtime.get(DATA_ALL_BATTERIES, {})
-    low_batteries = runtime.get(DATA_LOW_BATTERIES, {})
-    old_all_data = all_batteries.get(entity_id)
-    old_low_data = low_batteries.get(entity_id)
-
-    battery_data = {
-        "entity_id": entity_id,
-        "battery_level": battery_level,
-        "friendly_name": friendly_name,
-        "state_value": state.state,
-        "unit": state.attributes.get("unit_of_measurement", ""),
-        "is_low": battery_level <= threshold,
-        "last_changed": str(state.last_changed),
-        "last_updated": str(state.last_updated),
-    }
-    all_batteries[entity_id] = battery_data
-
-    if battery_level <= threshold:
-        was_already_low = entity_id in low_batteries
-        low_batteries[entity_id] = battery_data
-        if not was_already_low:
+    threshold = runtime.threshold
+    all_batteries = runtime.all_batteries
+    low_batteries = runtime.low_batteries
+    is_low = battery_level <= threshold
+    was_low = entity_id in low_batteries
+
+    record = all_batteries.get(entity_id)
+    if record is None:
+        record = BatteryRecord(
+            entity_id=entity_id,
+            battery_level=battery_level,
+            friendly_name=friendly_name,
+            state_value=state.state,
+            unit=attrs.get("unit_of_measurement", ""),
+            is_low=is_low,
+            last_changed=state.last_changed,
+            last_updated=state.last_updated,
+        )
+        all_batteries[entity_id] = record
+        changed = True
+    else:
+        changed = record.update(
+            battery_level=battery_level,
+            friendly_name=friendly_name,
+            state_value=state.state,
+            unit=attrs.get("unit_of_measurement", ""),
+            is_low=is_low,
+            last_changed=state.last_changed,
+            last_updated=state.last_updated,
+        )
+
+    if is_low:
+        low_batteries[entity_id] = record
+        if not was_low:
             _LOGGER.warning("Low battery detected: %s at %.1f%%", friendly_name, battery_level)
-    elif entity_id in low_batteries:
+    elif was_low:
         low_batteries.pop(entity_id)
         _LOGGER.info(
             "Battery recovered: %s at %.1f%% (threshold: %d%%)",
@@ -221,5 +366,6 @@ def _handle_battery_state_change(
             threshold,
         )
 
-    if old_all_data != all_batteries.get(entity_id) or old_low_data != low_batteries.get(entity_id):
-        notify_frontend_update(hass, entry, reason="state_update", entity_id=entity_id)
+    if changed or was_low != is_low:
+        mark_changed(runtime)
+        notify_frontend_update(runtime, reason="state_update", entity_id=entity_id)
@@ -1,36 +1,97 @@
 """Runtime state and payload helpers for Heimdall Battery Sentinel."""
 from __future__ import annotations
 
+import asyncio
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
 from typing import Any, Callable
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 
-from .const import (
-    CONF_THRESHOLD,
-    DATA_ALL_BATTERIES,
-    DATA_LOW_BATTERIES,
-    DATA_UNSUB,
-    DATA_WS_SUBSCRIBERS,
-    DEFAULT_THRESHOLD,
-    DOMAIN,
-)
-
-
-def init_entry_runtime(hass: HomeAssistant, entry_id: str) -> None:
+from .const import CONF_THRESHOLD, DEFAULT_THRESHOLD, DOMAIN
+
+
+@dataclass(slots=True)
+class BatteryRecord:
+    """Tracked reading for a single battery entity.
+
+    Timestamps are kept as datetimes and formatted by the JSON encoder when a
+    payload is sent, rather than stringified on every state change.
+    """
+
+    entity_id: str
+    battery_level: float
+    friendly_name: str
+    state_value: str
+    unit: str
+    is_low: bool
+    last_changed: datetime
+    last_updated: datetime
+
+    def update(
+        self,
+        battery_level: float,
+        friendly_name: str,
+        state_value: str,
+        unit: str,
+        is_low: bool,
+        last_changed: datetime,
+        last_updated: datetime,
+    ) -> bool:
+        """Update the record in place and return whether anything changed."""
+        if (
+            self.battery_level == battery_level
+            and self.friendly_name == friendly_name
+            and self.state_value == state_value
+            and self.unit == unit
+            and self.is_low == is_low
+            and self.last_changed == last_changed
+            and self.last_updated == last_updated
+        ):
+            return False
+
+        self.battery_level = battery_level
+        self.friendly_name = friendly_name
+        self.state_value = state_value
+        self.unit = unit
+        self.is_low = is_low
+        self.last_changed = last_changed
+        self.last_updated = last_updated
+        return True
+
+
+@dataclass(slots=True)
+class EntryRuntime:
+    """In-memory state for a single config entry."""
+
+    hass: HomeAssistant
+    threshold: int
+    all_batteries: dict[str, BatteryRecord] = field(default_factory=dict)
+    low_batteries: dict[str, BatteryRecord] = field(default_factory=dict)
+    unsubs: set[Callable[[], None]] = field(default_factory=set)
+    trackers: dict[str, Callable[[], None]] = field(default_factory=dict)
+    # Subscription ids are only unique per connection, so key on both.
+    ws_subscribers: set[tuple[Any, int]] = field(default_factory=set)
+    version: int = 0
+    bulk_update: bool = False
+    payload_cache: tuple[int, dict[str, Any]] | None = None
+    result_cache: dict[str, tuple[int, bytes]] = field(default_factory=dict)
+    pending_push: tuple[str, str] | None = None
+    push_handle: asyncio.TimerHandle | None = None
+    closed: bool = False
+
+
+def init_entry_runtime(hass: HomeAssistant, entry: ConfigEntry) -> EntryRuntime:
     """Initialize in-memory runtime state for a config entry."""
-    hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN][entry_id] = {
-        DATA_ALL_BATTERIES: {},
-        DATA_LOW_BATTERIES: {},
-        DATA_UNSUB: [],
-        DATA_WS_SUBSCRIBERS: [],
-    }
+    runtime = EntryRuntime(hass=hass, threshold=threshold_for_entry(entry))
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = runtime
+    return runtime
 
 
-def get_entry_runtime(hass: HomeAssistant, entry_id: str) -> dict[str, Any]:
-    """Return runtime state dictionary for a config entry."""
-    return hass.data.get(DOMAIN, {}).get(entry_id, {})
+def get_entry_runtime(hass: HomeAssistant, entry_id: str) -> EntryRuntime | None:
+    """Return runtime state for a config entry, if it is loaded."""
+    return hass.data.get(DOMAIN, {}).get(entry_id)
 
 
 def remove_entry_runtime(hass: HomeAssistant, entry_id: str) -> None:
@@ -38,16 +99,35 @@ def remove_entry_runtime(hass: HomeAssistant, entry_id: str) -> None:
     hass.data.get(DOMAIN, {}).pop(entry_id, None)
 
 
-def add_unsubscriber(hass: HomeAssistant, entry_id: str, unsub: Callable[[], None]) -> None:
+def add_unsubscriber(runtime: EntryRuntime, unsub: Callable[[], None]) -> None:
     """Register a cleanup callback for a config entry."""
-    get_entry_runtime(hass, entry_id).setdefault(DATA_UNSUB, []).append(unsub)
+    runtime.unsubs.add(unsub)
+
+
+def add_tracker(runtime: EntryRuntime, entity_id: str, unsub: Callable[[], None]) -> None:
+    """Register the per-entity state tracker cleanup callback for a config entry."""
+    runtime.trackers[entity_id] = unsub
+
 
+def remove_tracker(runtime: EntryRuntime, entity_id: str) -> bool:
+    """Stop tracking state changes for a single entity."""
+    unsub = runtime.trackers.pop(entity_id, None)
+    if unsub is None:
+        return False
+    unsub()
+    return True
 
-def unsubscribe_all(hass: HomeAssistant, entry_id: str) -> int:
+
+def unsubscribe_all(runtime: EntryRuntime) -> int:
     """Run and clear all registered cleanup callbacks for a config entry."""
-    runtime = get_entry_runtime(hass, entry_id)
-    unsubscribers = list(runtime.get(DATA_UNSUB, []))
-    runtime[DATA_UNSUB] = []
+    runtime.closed = True
+    unsubscribers = [*runtime.unsubs, *runtime.trackers.values()]
+    runtime.unsubs = set()
+    runtime.trackers = {}
+    if runtime.push_handle is not None:
+        runtime.push_handle.cancel()
+        runtime.push_handle = None
+    runtime.pending_push = None
     for unsub in unsubscribers:
         unsub()
     return len(unsubscribers)
@@ -67,11 +147,25 @@ def get_primary_entry(hass: HomeAssistant) -> ConfigEntry | None:
     return entries[0] if entries else None
 
 
-def build_payload(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
-    """Build frontend payload from current runtime state."""
-    entry_data = get_entry_runtime(hass, entry.entry_id)
-    return {
-        "all_batteries": list(entry_data.get(DATA_ALL_BATTERIES, {}).values()),
-        "low_batteries": list(entry_data.get(DATA_LOW_BATTERIES, {}).values()),
-        "threshold": threshold_for_entry(entry),
+def mark_changed(runtime: EntryRuntime) -> None:
+    """Invalidate cached payloads after the tracked battery data changed."""
+    runtime.version += 1
+
+
+def build_payload(runtime: EntryRuntime) -> dict[str, Any]:
+    """Return the frontend payload for the current runtime state.
+
+    The payload is cached per runtime version and shared between callers, so
+    it must not be mutated.
+    """
+    cache = runtime.payload_cache
+    if cache is not None and cache[0] == runtime.version:
+        return cache[1]
+
+    payload = {
+        "all_batteries": [asdict(record) for record in runtime.all_batteries.values()],
+        "low_batteries": [asdict(record) for record in runtime.low_batteries.values()],
+        "threshold": runtime.threshold,
     }
+    runtime.payload_cache = (runtime.version, payload)
+    return payload
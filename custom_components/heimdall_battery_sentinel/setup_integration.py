@@ -1,15 +1,15 @@
 #!/usr/bin/env python3
 """Set up Heimdall Battery Sentinel integration in Home Assistant."""
 
-import json
 import sys
 import os
+import traceback
 
 # Add parent directory to path to import from the same package
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from const import DOMAIN, DEFAULT_THRESHOLD
-from api_utils import make_request
+from api_utils import loads, make_request
 
 TOKEN = sys.argv[1] if len(sys.argv) > 1 else None
 THRESHOLD = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_THRESHOLD
@@ -37,7 +37,7 @@ try:
         print(f"  Response: {response_body}")
         sys.exit(1)
 
-    flow_response = json.loads(response_body)
+    flow_response = loads(response_body)
     flow_id = flow_response.get("flow_id")
 
     if not flow_id:
@@ -61,7 +61,7 @@ try:
         print(f"  Response: {response_body}")
         sys.exit(1)
 
-    result = json.loads(response_body)
+    result = loads(response_body)
 
     if result.get("type") == "create_entry":
         entry_id = result.get("result", {}).get("entry_id")
@@ -75,6 +75,5 @@ try:
 
 except Exception as e:
     print(f"Error: {e}")
-    import traceback
     traceback.print_exc()
     sys.exit(1)
@@ -1,24 +1,36 @@
 #!/usr/bin/env python3
 """Unload Heimdall Battery Sentinel integration from Home Assistant."""
 
-import json
 import sys
 import os
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 
 # Add parent directory to path to import from the same package
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from const import DOMAIN
-from api_utils import make_request
+from api_utils import loads, make_request
 
 TOKEN = sys.argv[1] if len(sys.argv) > 1 else None
 HA_URL = "http://localhost:8123"
+MAX_DELETE_WORKERS = 8
 
 if not TOKEN:
     print("Error: No access token provided")
     print("Usage: python3 unload_integration.py <token>")
     sys.exit(1)
 
+
+def delete_entry(entry_id):
+    """Delete a single config entry, returning (status_code, response_body)."""
+    return make_request(
+        f"{HA_URL}/api/config/config_entries/entry/{entry_id}",
+        method="DELETE",
+        token=TOKEN
+    )
+
+
 try:
     # Get all config entries
     print(f"Fetching config entries from {HA_URL}...")
@@ -33,26 +45,26 @@ try:
         print(f"Response: {response_body}")
         sys.exit(1)
 
-    entries = json.loads(response_body)
+    entries = loads(response_body)
     heimdall_battery_sentinel_entries = [e for e in entries if e.get("domain") == DOMAIN]
 
     if not heimdall_battery_sentinel_entries:
         print(f"No {DOMAIN} config entries found (integration not installed)")
         sys.exit(0)
 
-    # Delete each entry
+    # Delete entries concurrently; each deletion is an independent request
     print(f"Found {len(heimdall_battery_sentinel_entries)} {DOMAIN} config entries")
-    for entry in heimdall_battery_sentinel_entries:
-        entry_id = entry["entry_id"]
-        entry_title = entry.get("title", "Untitled")
+    entry_ids = []
+    for entry_id, entry_title in (
+        (e["entry_id"], e.get("title", "Untitled")) for e in heimdall_battery_sentinel_entries
+    ):
         print(f"  Removing config entry: {entry_id} ({entry_title})")
+        entry_ids.append(entry_id)
 
-        delete_status, delete_body = make_request(
-            f"{HA_URL}/api/config/config_entries/entry/{entry_id}",
-            method="DELETE",
-            token=TOKEN
-        )
+    with ThreadPoolExecutor(max_workers=min(len(entry_ids), MAX_DELETE_WORKERS)) as executor:
+        results = list(executor.map(delete_entry, entry_ids))
 
+    for entry_id, (delete_status, delete_body) in zip(entry_ids, results):
         if delete_status in (200, 204):
             print(f"  ✓ Removed entry {entry_id}")
         else:
@@ -63,6 +75,5 @@ try:
 
 except Exception as e:
     print(f"Error: {e}")
-    import traceback
     traceback.print_exc()
     sys.exit(1)
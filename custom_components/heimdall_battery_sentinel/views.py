@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 import logging
-import os
+from pathlib import Path
 
 from aiohttp import web
 from homeassistant.components.frontend import async_register_built_in_panel, async_remove_panel
@@ -13,16 +13,20 @@ from .const import DOMAIN, PANEL_ICON, PANEL_NAME, PANEL_TITLE
 
 _LOGGER = logging.getLogger(__name__)
 
+_CACHE_CONTROL = "public, max-age=300"
+
 
 async def async_register_panel_and_views(hass: HomeAssistant) -> None:
     """Register static views, then register the sidebar panel."""
     _LOGGER.debug("Registering Heimdall Battery Sentinel panel and views")
 
-    panel_js_path = hass.config.path(f"custom_components/{DOMAIN}/frontend/panel.js")
-    panel_html_path = hass.config.path(f"custom_components/{DOMAIN}/frontend/panel.html")
+    frontend_dir = Path(hass.config.path(f"custom_components/{DOMAIN}/frontend"))
+    panel_js, panel_html = await hass.async_add_executor_job(
+        _read_frontend_files, frontend_dir / "panel.js", frontend_dir / "panel.html"
+    )
 
-    hass.http.register_view(BatteryMonitorPanelJSView(panel_js_path))
-    hass.http.register_view(BatteryMonitorPanelHTMLView(panel_html_path))
+    hass.http.register_view(BatteryMonitorPanelJSView(panel_js))
+    hass.http.register_view(BatteryMonitorPanelHTMLView(panel_html))
 
     async_register_built_in_panel(
         hass,
@@ -41,30 +45,35 @@ def async_unregister_panel(hass: HomeAssistant) -> None:
     async_remove_panel(hass, PANEL_NAME)
 
 
+def _read_frontend_files(*paths: Path) -> list[bytes | None]:
+    """Read panel files from disk; missing files are returned as None."""
+    contents: list[bytes | None] = []
+    for path in paths:
+        try:
+            contents.append(path.read_bytes())
+        except OSError:
+            _LOGGER.error("Unable to read panel file %s", path)
+            contents.append(None)
+    return contents
+
+
 class _StaticFileView(HomeAssistantView):
-    """Base view to serve static files from disk."""
+    """Base view to serve a static panel file read once at registration."""
 
     requires_auth = False
     content_type: str
 
-    def __init__(self, file_path: str) -> None:
-        self.file_path = file_path
+    def __init__(self, content: bytes | None) -> None:
+        self.content = content
 
     async def get(self, request):
-        def read_file() -> str | None:
-            if not os.path.exists(self.file_path):
-                return None
-            with open(self.file_path, "r", encoding="utf-8") as file:
-                return file.read()
-
-        content = await request.app["hass"].async_add_executor_job(read_file)
-        if content is None:
+        if self.content is None:
             return web.Response(status=404, text="File not found")
 
         return web.Response(
-            text=content,
+            body=self.content,
             content_type=self.content_type,
-            headers={"Cache-Control": "no-store"},
+            headers={"Cache-Control": _CACHE_CONTROL},
         )
 
 
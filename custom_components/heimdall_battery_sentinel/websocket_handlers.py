@@ -5,57 +5,95 @@ import logging
 from typing import Any
 
 from homeassistant.components import websocket_api
-from homeassistant.config_entries import ConfigEntry
+from homeassistant.components.websocket_api.messages import construct_result_message
 from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.json import json_bytes
 
-from .const import DATA_LOW_BATTERIES, DATA_WS_SUBSCRIBERS, DOMAIN
-from .runtime import build_payload, get_entry_runtime, get_primary_entry
+from .runtime import EntryRuntime, build_payload, get_entry_runtime, get_primary_entry
 
 _LOGGER = logging.getLogger(__name__)
-_WS_REGISTERED_KEY = f"{DOMAIN}_ws_registered"
 
+# Seconds to wait before pushing, so bursts of changes go out as one update.
+PUSH_DELAY = 0.1
+BATCHED_UPDATE_REASON = "batched_update"
 
-def register_websocket_commands(hass: HomeAssistant) -> None:
-    """Register websocket commands once per HA instance."""
-    if hass.data.get(_WS_REGISTERED_KEY, False):
-        _LOGGER.debug("WebSocket API commands already registered, skipping")
-        return
 
-    _LOGGER.info("Registering WebSocket API commands")
+@callback
+def register_websocket_commands(hass: HomeAssistant) -> None:
+    """Register websocket commands; called once per HA instance from async_setup."""
+    _LOGGER.debug("Registering WebSocket API commands")
     websocket_api.async_register_command(hass, websocket_get_low_batteries)
     websocket_api.async_register_command(hass, websocket_get_all_batteries)
     websocket_api.async_register_command(hass, websocket_subscribe_battery_updates)
-    hass.data[_WS_REGISTERED_KEY] = True
 
 
 @callback
-def notify_frontend_update(
-    hass: HomeAssistant,
-    entry: ConfigEntry,
-    reason: str,
-    entity_id: str,
-) -> None:
-    """Push a battery payload update to all websocket subscribers."""
-    entry_data = get_entry_runtime(hass, entry.entry_id)
-    subscribers = list(entry_data.get(DATA_WS_SUBSCRIBERS, []))
-    if not subscribers:
+def notify_frontend_update(runtime: EntryRuntime, reason: str, entity_id: str) -> None:
+    """Schedule a battery payload push to all websocket subscribers.
+
+    Updates arriving within PUSH_DELAY are coalesced into a single push.
+    """
+    if runtime.bulk_update or not runtime.ws_subscribers:
+        return
+
+    if runtime.pending_push is not None:
+        runtime.pending_push = (BATCHED_UPDATE_REASON, "*")
+        return
+
+    runtime.pending_push = (reason, entity_id)
+    runtime.push_handle = runtime.hass.loop.call_later(
+        PUSH_DELAY, _flush_frontend_update, runtime
+    )
+
+
+@callback
+def _flush_frontend_update(runtime: EntryRuntime) -> None:
+    """Send the pending battery payload update to all websocket subscribers."""
+    pending = runtime.pending_push
+    runtime.pending_push = None
+    runtime.push_handle = None
+
+    # Subscribers may have gone away while the push was pending.
+    if pending is None or not runtime.ws_subscribers:
         return
 
-    payload = build_payload(hass, entry)
-    payload["reason"] = reason
-    payload["entity_id"] = entity_id
+    reason, entity_id = pending
+    event_json = json_bytes({**build_payload(runtime), "reason": reason, "entity_id": entity_id})
 
-    stale_subscribers: list[tuple[websocket_api.ActiveConnection, int]] = []
-    for connection, subscription_id in subscribers:
+    # Iterate a copy; failed sends discard their subscriber from the set.
+    for subscriber in list(runtime.ws_subscribers):
+        connection, subscription_id = subscriber
         try:
-            connection.send_message(websocket_api.event_message(subscription_id, payload))
+            connection.send_message(_event_message_json(subscription_id, event_json))
         except Exception:
-            stale_subscribers.append((connection, subscription_id))
+            runtime.ws_subscribers.discard(subscriber)
+
 
-    if stale_subscribers:
-        entry_data[DATA_WS_SUBSCRIBERS] = [
-            sub for sub in entry_data.get(DATA_WS_SUBSCRIBERS, []) if sub not in stale_subscribers
-        ]
+def _event_message_json(subscription_id: int, event_json: bytes) -> bytes:
+    """Wrap a pre-encoded event payload in a websocket event message."""
+    return b"".join(
+        (b'{"id":', str(subscription_id).encode(), b',"type":"event","event":', event_json, b"}")
+    )
+
+
+def _get_primary_runtime(hass: HomeAssistant) -> EntryRuntime | None:
+    """Return runtime state for the primary Heimdall entry, if loaded."""
+    entry = get_primary_entry(hass)
+    if not entry:
+        return None
+    return get_entry_runtime(hass, entry.entry_id)
+
+
+def _cached_result_json(runtime: EntryRuntime, key: str) -> bytes:
+    """Return the JSON-encoded result for a battery list, cached per runtime version."""
+    cached = runtime.result_cache.get(key)
+    if cached is not None and cached[0] == runtime.version:
+        return cached[1]
+
+    payload = build_payload(runtime)
+    encoded = json_bytes({key: payload[key], "threshold": payload["threshold"]})
+    runtime.result_cache[key] = (runtime.version, encoded)
+    return encoded
 
 
 @websocket_api.websocket_command({"type": "heimdall_battery_sentinel/get_low_batteries"})
@@ -67,21 +105,19 @@ def websocket_get_low_batteries(
 ) -> None:
     """Return low battery payload to a websocket client."""
     _LOGGER.debug("WebSocket: heimdall_battery_sentinel/get_low_batteries called")
-    entry = get_primary_entry(hass)
-    if not entry:
+    runtime = _get_primary_runtime(hass)
+    if runtime is None:
         connection.send_error(msg["id"], "no_config", "No Heimdall Battery Sentinel configuration found")
         return
 
-    entry_data = get_entry_runtime(hass, entry.entry_id)
-    payload = build_payload(hass, entry)
-    payload.pop("all_batteries", None)
-    payload["low_batteries"] = list(entry_data.get(DATA_LOW_BATTERIES, {}).values())
     _LOGGER.debug(
         "WebSocket: Returning %d low batteries (threshold: %d%%)",
-        len(payload["low_batteries"]),
-        payload["threshold"],
+        len(runtime.low_batteries),
+        runtime.threshold,
+    )
+    connection.send_message(
+        construct_result_message(msg["id"], _cached_result_json(runtime, "low_batteries"))
     )
-    connection.send_result(msg["id"], payload)
 
 
 @websocket_api.websocket_command({"type": "heimdall_battery_sentinel/get_all_batteries"})
@@ -93,19 +129,19 @@ def websocket_get_all_batteries(
 ) -> None:
     """Return all tracked battery payload to a websocket client."""
     _LOGGER.debug("WebSocket: heimdall_battery_sentinel/get_all_batteries called")
-    entry = get_primary_entry(hass)
-    if not entry:
+    runtime = _get_primary_runtime(hass)
+    if runtime is None:
         connection.send_error(msg["id"], "no_config", "No Heimdall Battery Sentinel configuration found")
         return
 
-    payload = build_payload(hass, entry)
-    payload.pop("low_batteries", None)
     _LOGGER.debug(
         "WebSocket: Returning %d all batteries (threshold: %d%%)",
-        len(payload["all_batteries"]),
-        payload["threshold"],
+        len(runtime.all_batteries),
+        runtime.threshold,
+    )
+    connection.send_message(
+        construct_result_message(msg["id"], _cached_result_json(runtime, "all_batteries"))
     )
-    connection.send_result(msg["id"], payload)
 
 
 @websocket_api.websocket_command({"type": "heimdall_battery_sentinel/subscribe_updates"})
@@ -116,22 +152,17 @@ def websocket_subscribe_battery_updates(
     msg: dict[str, Any],
 ) -> None:
     """Subscribe a websocket client to battery payload update events."""
-    entry = get_primary_entry(hass)
-    if not entry:
+    runtime = _get_primary_runtime(hass)
+    if runtime is None:
         connection.send_error(msg["id"], "no_config", "No Heimdall Battery Sentinel configuration found")
         return
 
-    entry_data = get_entry_runtime(hass, entry.entry_id)
-    subscribers = entry_data.setdefault(DATA_WS_SUBSCRIBERS, [])
     subscriber = (connection, msg["id"])
-    subscribers.append(subscriber)
+    runtime.ws_subscribers.add(subscriber)
 
     @callback
     def _unsubscribe() -> None:
-        runtime = get_entry_runtime(hass, entry.entry_id)
-        subs = runtime.get(DATA_WS_SUBSCRIBERS, [])
-        if subscriber in subs:
-            subs.remove(subscriber)
+        runtime.ws_subscribers.discard(subscriber)
 
     connection.subscriptions[msg["id"]] = _unsubscribe
     connection.send_result(msg["id"])
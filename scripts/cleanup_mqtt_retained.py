@@ -8,8 +8,16 @@ import json
 import os
 import sys
 import time
+from collections.abc import Callable
 from pathlib import Path
 
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
 
 DEFAULT_HOST = "mqtt"
 DEFAULT_PORT = 1883
@@ -19,7 +27,9 @@ DEFAULT_PREFIX = "homeassistant/"
 
 
 def parse_args() -> argparse.Namespace:
-    parser = argparse.ArgumentParser(description="Clean up retained MQTT topics.")
+    parser = argparse.ArgumentParser(
+        description="Clean up retained MQTT topics. Requires an MQTT 5 broker (e.g. Mosquitto 1.6+)."
+    )
     parser.add_argument("--host", default=DEFAULT_HOST, help=f"Broker hostname (default: {DEFAULT_HOST})")
     parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Broker port (default: {DEFAULT_PORT})")
     parser.add_argument("--user", default=DEFAULT_USER, help=f"Broker username (default: {DEFAULT_USER})")
@@ -47,7 +57,16 @@ def parse_args() -> argparse.Namespace:
         help="Hard limit for topic scan duration in seconds (default: 20)",
     )
     parser.add_argument("--execute", action="store_true", help="Actually delete retained topics")
-    parser.add_argument("--yes", action="store_true", help="Reserved flag (currently no-op)")
+    parser.add_argument(
+        "--yes",
+        action="store_true",
+        help="Delete all targeted topics without prompting for each one (with --execute)",
+    )
+    parser.add_argument(
+        "--no-table",
+        action="store_true",
+        help="Skip printing the table of targeted topics",
+    )
     return parser.parse_args()
 
 
@@ -74,9 +93,9 @@ def import_mqtt():
 def new_client(mqtt, user: str, password: str):
     # Compatible across paho-mqtt major versions.
     try:
-        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, protocol=mqtt.MQTTv5)
     except Exception:
-        client = mqtt.Client()
+        client = mqtt.Client(protocol=mqtt.MQTTv5)
     client.username_pw_set(user, password)
     return client
 
@@ -103,19 +122,24 @@ def is_connack_success(reason_code) -> bool:
 
 def scan_retained_topics(
     mqtt,
+    client,
     host: str,
     port: int,
-    user: str,
-    password: str,
     timeout_seconds: float,
     max_scan_seconds: float,
-) -> dict[str, str]:
-    topics: dict[str, str] = {}
+    prefixes: tuple[str, ...] | None,
+    on_retained: Callable[[str, bytes], None],
+) -> None:
+    """Stream each retained topic and its payload to on_retained without storing them.
+
+    Only topics starting with one of prefixes are passed on; None passes all.
+    The client is left connected with its # subscription removed so the
+    delete phase can reuse the connection; the caller disconnects it.
+    """
     connected = False
     connection_error: str | None = None
     last_activity = time.monotonic()
-
-    client = new_client(mqtt, user, password)
+    retained_count = 0
 
     def on_connect(client, _userdata, _flags, reason_code, _properties=None):
         nonlocal connected, connection_error, last_activity
@@ -125,106 +149,127 @@ def scan_retained_topics(
                 return
             connected = True
             last_activity = time.monotonic()
-            client.subscribe("#", qos=0)
+            # Retained messages are delivered in a burst on subscribe; ask for
+            # them explicitly so a resumed session still gets them.
+            client.subscribe(
+                "#",
+                options=mqtt.SubscribeOptions(
+                    qos=0,
+                    noLocal=True,
+                    retainHandling=mqtt.SubscribeOptions.RETAIN_SEND_ON_SUBSCRIBE,
+                ),
+            )
         except Exception as err:
             connection_error = f"MQTT connect callback failed: {err}"
 
     def on_message(_client, _userdata, msg):
-        nonlocal last_activity
-        last_activity = time.monotonic()
-        if msg.retain:
-            payload = msg.payload.decode("utf-8", errors="replace") if msg.payload else ""
-            topics[msg.topic] = payload
+        nonlocal retained_count
+        # Live traffic is dropped without counting as activity, so a busy
+        # broker doesn't hold the scan open once the retained burst is over.
+        if not msg.retain:
+            return
+        retained_count += 1
+        topic = msg.topic
+        if prefixes is None or topic.startswith(prefixes):
+            on_retained(topic, msg.payload or b"")
 
     client.on_connect = on_connect
     client.on_message = on_message
 
+    # The network loop runs on this thread, so callbacks fire from inside
+    # client.loop() and no background thread or cross-thread signalling is
+    # needed.
     client.connect(host, port, keepalive=30)
-    client.loop_start()
+    deadline = time.monotonic() + max_scan_seconds
+    seen_count = 0
+    while True:
+        if connection_error:
+            raise RuntimeError(connection_error)
+        now = time.monotonic()
+        # Messages only arrive inside client.loop(), so comparing counts here
+        # times activity without reading the clock in on_message.
+        if retained_count != seen_count:
+            seen_count = retained_count
+            last_activity = now
+        wait_for = deadline - now
+        if connected:
+            wait_for = min(wait_for, timeout_seconds - (now - last_activity))
+        if wait_for <= 0:
+            break
+        rc = client.loop(timeout=min(wait_for, 0.5))
+        if rc != mqtt.MQTT_ERR_SUCCESS:
+            raise RuntimeError(f"MQTT connection lost while scanning, rc={rc}")
+
+    # Stop the firehose; anything still in flight is ignored.
+    client.on_message = None
+    client.unsubscribe("#")
+
+
+def _text(value) -> str:
+    """Return a payload field as display text; most fields are already strings."""
+    if isinstance(value, str):
+        return value
+    return str(value) if value else ""
+
+
+def _row_from_topic_and_payload(topic: str, payload: bytes) -> list[str]:
+    # Discovery configs are JSON objects; skip parsing anything else, such as
+    # plain state values or binary blobs.
+    if not payload.startswith(b"{"):
+        return [topic, "", ""]
     try:
-        start = time.monotonic()
-        while True:
-            now = time.monotonic()
-            if connection_error:
-                raise RuntimeError(connection_error)
-            if connected and (now - last_activity) >= timeout_seconds:
-                break
-            if (now - start) >= max_scan_seconds:
-                break
-            time.sleep(0.05)
-    finally:
-        client.disconnect()
-        client.loop_stop()
-
-    return topics
-
-
-def filter_topics(topics: dict[str, str], prefixes: list[str], all_retained: bool) -> list[str]:
-    if all_retained:
-        return sorted(topics.keys())
-    return sorted(
-        topic for topic in topics.keys() if any(topic.startswith(prefix) for prefix in prefixes)
-    )
-
-
-def _row_from_topic_and_payload(topic: str, payload: str) -> list[str]:
-    entity_name = ""
-    manufacturer = ""
-    model = ""
-
-    if payload:
-        try:
-            data = json.loads(payload)
-            if isinstance(data, dict):
-                entity_name = str(data.get("name", "") or "")
-                device = data.get("device", {})
-                if isinstance(device, dict):
-                    manufacturer = str(device.get("manufacturer", "") or "")
-                    model = str(device.get("model", "") or "")
-                    if not entity_name:
-                        entity_name = str(device.get("name", "") or "")
-        except Exception:
-            pass
-
-    device = " ".join(part for part in [manufacturer, model] if part).strip()
-    return [topic, entity_name, device]
-
-
-def print_entities_table(target_topics: list[str], topics_map: dict[str, str]) -> None:
+        # Both parsers take the raw bytes; invalid UTF-8 raises a ValueError.
+        # The stdlib parser raises RecursionError on deeply nested payloads.
+        data = _loads(payload)
+    except (ValueError, RecursionError):
+        return [topic, "", ""]
+    if not isinstance(data, dict):
+        return [topic, "", ""]
+
+    entity_name = _text(data.get("name"))
+    device = data.get("device")
+    if not isinstance(device, dict):
+        return [topic, entity_name, ""]
+
+    manufacturer = _text(device.get("manufacturer"))
+    model = _text(device.get("model"))
+    if not entity_name:
+        entity_name = _text(device.get("name"))
+    return [topic, entity_name, f"{manufacturer} {model}".strip()]
+
+
+def print_entities_table(target_topics: list[str], rows_map: dict[str, list[str]]) -> None:
     headers = ["topic", "entity name", "device"]
-    rows = [_row_from_topic_and_payload(topic, topics_map.get(topic, "")) for topic in target_topics]
+    widths = [len(header) for header in headers]
+    rows = []
+    for topic in sorted(target_topics):
+        row = rows_map[topic]
+        rows.append(row)
+        for i, cell in enumerate(row):
+            if len(cell) > widths[i]:
+                widths[i] = len(cell)
 
-    table_rows = [headers] + rows
-    widths = [max(len(str(row[i])) for row in table_rows) for i in range(len(headers))]
+    row_template = "| " + " | ".join(f"{{:<{width}}}" for width in widths) + " |\n"
+    divider = "|-" + "-|-".join("-" * w for w in widths) + "-|\n"
 
-    def format_row(row: list[str]) -> str:
-        return "| " + " | ".join(str(cell).ljust(widths[i]) for i, cell in enumerate(row)) + " |"
-
-    divider = "|-" + "-|-".join("-" * w for w in widths) + "-|"
-
-    print("Entities:")
-    print(format_row(headers))
-    print(divider)
-    for row in rows:
-        print(format_row(row))
+    lines = ["Entities:\n", row_template.format(*headers), divider]
+    lines.extend(row_template.format(*row) for row in rows)
+    sys.stdout.write("".join(lines))
 
 
 def delete_topics(
     mqtt,
-    host: str,
-    port: int,
-    user: str,
-    password: str,
+    client,
     target_topics: list[str],
-    topics_map: dict[str, str],
+    rows_map: dict[str, list[str]],
+    assume_yes: bool = False,
 ) -> int:
-    client = new_client(mqtt, user, password)
-    client.connect(host, port, keepalive=30)
-    client.loop_start()
-    deleted = 0
-    try:
-        for index, topic in enumerate(target_topics, start=1):
-            row = _row_from_topic_and_payload(topic, topics_map.get(topic, ""))
+    to_delete: list[str] = []
+    if assume_yes:
+        to_delete = list(target_topics)
+    else:
+        for index, topic in enumerate(sorted(target_topics), start=1):
+            row = rows_map[topic]
             print("")
             print(f"[{index}/{len(target_topics)}] Ready to delete retained topic:")
             print(f"  topic: {row[0]}")
@@ -234,16 +279,22 @@ def delete_topics(
             if confirm != "y":
                 print("  Skipped.")
                 continue
-            info = client.publish(topic, payload=b"", qos=0, retain=True)
-            info.wait_for_publish()
-            if info.rc != mqtt.MQTT_ERR_SUCCESS:
-                raise RuntimeError(f"Failed to delete retained topic '{topic}', rc={info.rc}")
-            deleted += 1
-            print("  Deleted.")
-    finally:
-        client.disconnect()
-        client.loop_stop()
-    return deleted
+            to_delete.append(topic)
+            print("  Queued.")
+
+    if not to_delete:
+        return 0
+
+    # Publish every deletion back to back, then wait for them all once,
+    # rather than paying a round trip per topic.
+    infos = [
+        (topic, client.publish(topic, payload=b"", qos=0, retain=True)) for topic in to_delete
+    ]
+    for topic, info in infos:
+        info.wait_for_publish()
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            raise RuntimeError(f"Failed to delete retained topic '{topic}', rc={info.rc}")
+    return len(to_delete)
 
 
 def main() -> int:
@@ -266,23 +317,41 @@ def main() -> int:
         print(f"Error: {err}", file=sys.stderr)
         return 1
 
+    # One connection serves both the scan and the delete phase.
+    client = new_client(mqtt, args.user, password)
+    try:
+        return run_cleanup(args, mqtt, client, prefixes)
+    finally:
+        client.disconnect()
+        client.loop_stop()
+
+
+def run_cleanup(args: argparse.Namespace, mqtt, client, prefixes: list[str]) -> int:
+    # Only the small display row is kept per topic; payloads are dropped as
+    # soon as they have been parsed.
+    rows_map: dict[str, list[str]] = {}
+
+    def on_retained(topic: str, payload: bytes) -> None:
+        rows_map[topic] = _row_from_topic_and_payload(topic, payload)
+
     print(f"Scanning retained topics from {args.user}@{args.host}:{args.port} ...")
     try:
-        all_topics = scan_retained_topics(
+        scan_retained_topics(
             mqtt,
+            client,
             host=args.host,
             port=args.port,
-            user=args.user,
-            password=password,
             timeout_seconds=args.timeout,
             max_scan_seconds=args.max_scan_seconds,
+            prefixes=None if args.all_retained else tuple(prefixes),
+            on_retained=on_retained,
         )
     except Exception as err:
         print(f"Error while scanning retained topics: {err}", file=sys.stderr)
         return 1
 
-    print(f"Found {len(all_topics)} retained topic(s) total.")
-    targets = filter_topics(all_topics, prefixes, args.all_retained)
+    # Left unsorted; only the table and the interactive prompts need ordering.
+    targets = list(rows_map)
     if not targets:
         print("No retained topics matched the selected scope. Nothing to do.")
         return 0
@@ -295,23 +364,25 @@ def main() -> int:
         print("Scope prefixes:")
         for prefix in prefixes:
             print(f"  - {prefix}")
-    print("")
-    print_entities_table(targets, all_topics)
+    if not args.no_table:
+        print("")
+        print_entities_table(targets, rows_map)
 
     if not args.execute:
         print("")
         print("Dry run only. Re-run with --execute to delete these retained topics.")
         return 0
 
+    # The network thread keeps the connection alive while the user answers
+    # the per-topic prompts.
+    client.loop_start()
     try:
         deleted = delete_topics(
             mqtt,
-            host=args.host,
-            port=args.port,
-            user=args.user,
-            password=password,
+            client,
             target_topics=targets,
-            topics_map=all_topics,
+            rows_map=rows_map,
+            assume_yes=args.yes,
         )
     except Exception as err:
         print(f"Error while deleting topics: {err}", file=sys.stderr)
@@ -11,11 +11,43 @@ It uses:
 from __future__ import annotations
 
 import argparse
+import http.client
 import json
 import os
 import sys
+import threading
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from urllib import error, parse, request
+from urllib import parse
+
+try:
+    import orjson
+
+    _dumps = orjson.dumps
+except ImportError:
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+
+REQUEST_TIMEOUT = 30
+
+# Entity registry REST endpoints differ between HA versions; the one that
+# last worked is remembered so later runs can try it on its own first.
+REGISTRY_PATH_PREFIXES = (
+    "/api/config/entity_registry/entity/",
+    "/api/config/entity_registry/entry/",
+)
+REGISTRY_ENDPOINT_CACHE = Path("~/.cache/heimdall/ha_registry_endpoint").expanduser()
+
+# Keep-alive connections reused across requests, keyed by HA base URL. They
+# are per thread because concurrent probes cannot share a connection; the
+# probe pool is kept for the whole run so its workers reuse theirs too.
+_local = threading.local()
+_open_connections: set[http.client.HTTPConnection] = set()
+_open_connections_lock = threading.Lock()
+_probe_executor: ThreadPoolExecutor | None = None
 
 
 def load_token() -> str | None:
@@ -30,6 +62,60 @@ def load_token() -> str | None:
     return None
 
 
+def _connections() -> dict[str, tuple[http.client.HTTPConnection, str]]:
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    return connections
+
+
+def _get_connection(ha_url: str) -> tuple[http.client.HTTPConnection, str, bool]:
+    """Return (connection, base_path, is_new) for an HA base URL."""
+    cached = _connections().get(ha_url)
+    if cached is not None:
+        return cached[0], cached[1], False
+
+    parts = parse.urlsplit(ha_url)
+    if parts.scheme == "https":
+        conn = http.client.HTTPSConnection(parts.netloc, timeout=REQUEST_TIMEOUT)
+    else:
+        conn = http.client.HTTPConnection(parts.netloc, timeout=REQUEST_TIMEOUT)
+    base_path = parts.path.rstrip("/")
+    _connections()[ha_url] = (conn, base_path)
+    with _open_connections_lock:
+        _open_connections.add(conn)
+    return conn, base_path, True
+
+
+def _drop_connection(ha_url: str) -> None:
+    cached = _connections().pop(ha_url, None)
+    if cached is not None:
+        with _open_connections_lock:
+            _open_connections.discard(cached[0])
+        cached[0].close()
+
+
+def _get_probe_executor() -> ThreadPoolExecutor:
+    global _probe_executor
+    if _probe_executor is None:
+        _probe_executor = ThreadPoolExecutor(max_workers=len(REGISTRY_PATH_PREFIXES))
+    return _probe_executor
+
+
+def close_connections() -> None:
+    """Stop the probe pool and close every open keep-alive connection."""
+    global _probe_executor
+    if _probe_executor is not None:
+        _probe_executor.shutdown()
+        _probe_executor = None
+    with _open_connections_lock:
+        connections = list(_open_connections)
+        _open_connections.clear()
+    for conn in connections:
+        conn.close()
+    _connections().clear()
+
+
 def api_request(
     ha_url: str,
     token: str,
@@ -41,37 +127,105 @@ def api_request(
     headers = {
         "Authorization": f"Bearer {token}",
         "Content-Type": "application/json",
+        "Connection": "keep-alive",
     }
     if payload is not None:
-        body = json.dumps(payload).encode("utf-8")
+        body = _dumps(payload)
+
+    ha_url = ha_url.rstrip("/")
+    while True:
+        conn, base_path, is_new = _get_connection(ha_url)
+        try:
+            conn.request(method, f"{base_path}{path}", body=body, headers=headers)
+            resp = conn.getresponse()
+            return resp.status, resp.read().decode("utf-8")
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as exc:
+            # The server may close an idle keep-alive connection; retry once
+            # on a fresh connection.
+            _drop_connection(ha_url)
+            if is_new:
+                raise RuntimeError(f"Request failed for {method} {path}: {exc}") from exc
+        except Exception as exc:
+            _drop_connection(ha_url)
+            raise RuntimeError(f"Request failed for {method} {path}: {exc}") from exc
+
+
+def _request_candidates(
+    ha_url: str,
+    token: str,
+    method: str,
+    paths: list[str],
+    serial: bool = False,
+) -> Iterator[tuple[str, int, str]]:
+    """Yield (path, status, body) for each candidate path, in order.
+
+    All paths are requested concurrently so a 404 on the first one costs no
+    extra round trip. With serial, each path is only requested once the
+    caller moves on from the previous one.
+    """
+    if serial or len(paths) < 2:
+        for path in paths:
+            yield (path, *api_request(ha_url, token, method, path))
+        return
+
+    executor = _get_probe_executor()
+    futures = [executor.submit(api_request, ha_url, token, method, path) for path in paths]
+    for path, future in zip(paths, futures):
+        yield (path, *future.result())
+
+
+def _load_registry_prefix() -> str | None:
+    try:
+        prefix = REGISTRY_ENDPOINT_CACHE.read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+    return prefix if prefix in REGISTRY_PATH_PREFIXES else None
 
-    req = request.Request(
-        url=f"{ha_url.rstrip('/')}{path}",
-        data=body,
-        method=method,
-        headers=headers,
-    )
 
+def _remember_registry_path(path: str) -> None:
+    prefix = path[: path.rindex("/") + 1]
     try:
-        with request.urlopen(req, timeout=30) as resp:
-            return resp.status, resp.read().decode("utf-8")
-    except error.HTTPError as http_err:
-        return http_err.code, http_err.read().decode("utf-8")
-    except Exception as exc:
-        raise RuntimeError(f"Request failed for {method} {path}: {exc}") from exc
+        REGISTRY_ENDPOINT_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        REGISTRY_ENDPOINT_CACHE.write_text(prefix, encoding="utf-8")
+    except OSError:
+        pass
 
 
-def delete_entity_registry_entry(ha_url: str, token: str, entity_id: str) -> tuple[bool, str]:
-    """Best-effort entity registry removal via REST endpoints if available."""
+def _request_registry_paths(
+    ha_url: str,
+    token: str,
+    method: str,
+    entity_id: str,
+    serial: bool = False,
+) -> Iterator[tuple[str, int, str]]:
+    """Yield registry endpoint responses for an entity, cached endpoint first.
+
+    The remembered endpoint is requested alone; the others are only probed
+    if the caller moves on from it.
+    """
     quoted = parse.quote(entity_id, safe="")
-    candidate_paths = [
-        f"/api/config/entity_registry/entity/{quoted}",
-        f"/api/config/entity_registry/entry/{quoted}",
-    ]
+    cached = _load_registry_prefix()
+    if cached is None:
+        paths = [f"{prefix}{quoted}" for prefix in REGISTRY_PATH_PREFIXES]
+        yield from _request_candidates(ha_url, token, method, paths, serial)
+        return
 
-    for path in candidate_paths:
-        status, body = api_request(ha_url, token, "DELETE", path)
+    yield from _request_candidates(ha_url, token, method, [f"{cached}{quoted}"], serial)
+    paths = [f"{prefix}{quoted}" for prefix in REGISTRY_PATH_PREFIXES if prefix != cached]
+    yield from _request_candidates(ha_url, token, method, paths, serial)
+
+
+def delete_entity_registry_entry(ha_url: str, token: str, entity_id: str) -> tuple[bool, str]:
+    """Best-effort entity registry removal via REST endpoints if available.
+
+    Candidates are tried one at a time: DELETE mutates, so the next endpoint
+    is only tried after the previous one answered 404.
+    """
+    for path, status, body in _request_registry_paths(
+        ha_url, token, "DELETE", entity_id, serial=True
+    ):
         if status in (200, 204):
+            _remember_registry_path(path)
             return True, f"Removed entity registry entry via {path}"
         if status == 404:
             continue
@@ -80,7 +234,9 @@ def delete_entity_registry_entry(ha_url: str, token: str, entity_id: str) -> tup
     return False, "No REST entity registry delete endpoint was available on this HA instance"
 
 
-def entity_exists(ha_url: str, token: str, entity_id: str) -> tuple[bool, str]:
+def entity_exists(
+    ha_url: str, token: str, entity_id: str, serial: bool = False
+) -> tuple[bool, str]:
     """Check whether an entity exists in state machine or entity registry."""
     quoted = parse.quote(entity_id, safe="")
 
@@ -91,13 +247,9 @@ def entity_exists(ha_url: str, token: str, entity_id: str) -> tuple[bool, str]:
         return False, f"state lookup failed ({state_status}): {state_body}"
 
     # Fall back to entity registry lookup for entities with no current state.
-    candidate_paths = [
-        f"/api/config/entity_registry/entity/{quoted}",
-        f"/api/config/entity_registry/entry/{quoted}",
-    ]
-    for path in candidate_paths:
-        status, body = api_request(ha_url, token, "GET", path)
+    for path, status, body in _request_registry_paths(ha_url, token, "GET", entity_id, serial):
         if status == 200:
+            _remember_registry_path(path)
             return True, f"found in entity registry via {path}"
         if status == 404:
             continue
@@ -107,6 +259,13 @@ def entity_exists(ha_url: str, token: str, entity_id: str) -> tuple[bool, str]:
 
 
 def main() -> int:
+    try:
+        return _run()
+    finally:
+        close_connections()
+
+
+def _run() -> int:
     parser = argparse.ArgumentParser(
         description="Delete a Home Assistant entity by entity_id via Home Assistant APIs."
     )
@@ -116,6 +275,11 @@ def main() -> int:
         default=os.environ.get("HA_URL", "http://homeassistant:8123"),
         help="Home Assistant base URL (default: HA_URL env var or http://homeassistant:8123)",
     )
+    parser.add_argument(
+        "--serial",
+        action="store_true",
+        help="Look up entity registry endpoints one at a time instead of concurrently",
+    )
     args = parser.parse_args()
 
     entity_id = args.entity_id.strip()
@@ -131,7 +295,7 @@ def main() -> int:
 
     ha_url = args.ha_url.rstrip("/")
 
-    exists, exists_message = entity_exists(ha_url, token, entity_id)
+    exists, exists_message = entity_exists(ha_url, token, entity_id, serial=args.serial)
     if not exists:
         print(f"Error: Entity '{entity_id}' was not found ({exists_message}).", file=sys.stderr)
         return 1